@@ -25,13 +25,14 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 THE SOFTWARE.
 """
 
+import hashlib
 from abc import ABC, abstractmethod
+from functools import lru_cache
+from itertools import chain
 from typing import TYPE_CHECKING, Any
 
 import numpy
 
-from pytools import memoize, memoize_method
-
 
 try:
     # NOTE: pycuda still needs this for complex number support.
@@ -43,77 +44,157 @@ if TYPE_CHECKING:
     from collections.abc import Generator, Sequence
 
 
-@memoize
-def is_long_64_bit():
-    return _struct.calcsize("l") == 8
+@lru_cache(maxsize=256)
+def _struct_for(fmt: str) -> _struct.Struct:
+    return _struct.Struct(fmt)
+
+
+_LONG_IS_64_BIT: bool = _struct.calcsize("l") == 8
+
+
+def is_long_64_bit() -> bool:
+    return _LONG_IS_64_BIT
+
+
+_DTYPE_TO_CTYPE = {
+        numpy.dtype(numpy.int64): "long" if _LONG_IS_64_BIT else "long long",
+        numpy.dtype(numpy.uint64): (
+            "unsigned long" if _LONG_IS_64_BIT else "unsigned long long"),
+        numpy.dtype(numpy.int32): "int",
+        numpy.dtype(numpy.uint32): "unsigned int",
+        numpy.dtype(numpy.int16): "short int",
+        numpy.dtype(numpy.uint16): "short unsigned int",
+        numpy.dtype(numpy.int8): "signed char",
+        numpy.dtype(numpy.uint8): "unsigned char",
+        numpy.dtype(numpy.float32): "float",
+        numpy.dtype(numpy.float64): "double",
+        numpy.dtype(numpy.complex64): "std::complex<float>",
+        numpy.dtype(numpy.complex128): "std::complex<double>",
+        numpy.dtype(numpy.void): "void",
+        }
+
+
+def _dtype_to_ctype_fast(dtype: numpy.dtype) -> str:
+    # *dtype* must already be a numpy.dtype instance.
+    try:
+        return _DTYPE_TO_CTYPE[dtype]
+    except KeyError:
+        raise ValueError(f"unable to map dtype '{dtype}'") from None
+
+
+def _dtype_to_ctype_uncached(dtype):
+    if not isinstance(dtype, numpy.dtype):
+        dtype = numpy.dtype(dtype)
+    return _dtype_to_ctype_fast(dtype)
+
+
+# Keyed on the caller's (hashable) dtype specification, so that repeated
+# lookups by scalar type or type string skip numpy.dtype() construction.
+_dtype_to_ctype_cached = lru_cache(maxsize=128)(_dtype_to_ctype_uncached)
 
 
 def dtype_to_ctype(dtype):
     if dtype is None:
         raise ValueError("dtype may not be None")
 
-    dtype = numpy.dtype(dtype)
-    if dtype == numpy.int64:
-        if is_long_64_bit():
-            return "long"
-        else:
-            return "long long"
-    elif dtype == numpy.uint64:
-        if is_long_64_bit():
-            return "unsigned long"
-        else:
-            return "unsigned long long"
-    elif dtype == numpy.int32:
-        return "int"
-    elif dtype == numpy.uint32:
-        return "unsigned int"
-    elif dtype == numpy.int16:
-        return "short int"
-    elif dtype == numpy.uint16:
-        return "short unsigned int"
-    elif dtype == numpy.int8:
-        return "signed char"
-    elif dtype == numpy.uint8:
-        return "unsigned char"
-    elif dtype == numpy.float32:
-        return "float"
-    elif dtype == numpy.float64:
-        return "double"
-    elif dtype == numpy.complex64:
-        return "std::complex<float>"
-    elif dtype == numpy.complex128:
-        return "std::complex<double>"
-    elif dtype == numpy.void:
-        return "void"
-    else:
-        raise ValueError(f"unable to map dtype '{dtype}'")
+    try:
+        hash(dtype)
+    except TypeError:
+        # unhashable dtype specification, e.g. a list of fields
+        return _dtype_to_ctype_uncached(dtype)
+
+    return _dtype_to_ctype_cached(dtype)
+
+
+@lru_cache(maxsize=64)
+def _indent(depth: int) -> str:
+    """Return the (shared) indentation prefix for nesting depth *depth*."""
+    return "  " * depth
 
 
 class Generable(ABC):
+    __slots__ = ()
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+
+        # A generate() that takes precedence in the MRO over a specialized
+        # _emit() or __str__(), e.g. one defined by the subclass itself or
+        # by a mixin listed first, must not be bypassed by them.
+        mro = cls.__mro__
+
+        def provider_index(name: str) -> int:
+            return next(i for i, base in enumerate(mro) if name in base.__dict__)
+
+        generate_index = provider_index("generate")
+        if generate_index < provider_index("_emit"):
+            cls._emit = Generable._emit  # type: ignore[method-assign]
+        if generate_index < provider_index("__str__"):
+            cls.__str__ = Generable.__str__  # type: ignore[method-assign]
+
     def __str__(self) -> str:
         """Return a single string (possibly containing newlines) representing
         this code construct."""
-        return "\n".join(line.rstrip() for line in self.generate())
+        lines: list[str] = []
+        self._emit(lines)
+        return "\n".join(lines)
+
+    def render(self, out: list[str] | None = None) -> list[str]:
+        """Append the lines making up this code construct to *out*, without
+        trailing whitespace, and return *out*. If *out* is *None*, a new list
+        is created.
+
+        These are the lines that :meth:`__str__` joins. Several constructs may
+        be rendered into the same list before joining it once.
+        """
+        if out is None:
+            out = []
+        self._emit(out)
+        return out
 
     @abstractmethod
     def generate(self, with_semicolon: bool = True) -> Generator[str]:
         """Generate (i.e. yield) the lines making up this code construct."""
 
+    def _emit(self, out: list[str], indent: int = 0, **kwargs: Any) -> None:
+        """Append the lines making up this code construct to *out*, indented
+        by *indent* levels and stripped of trailing whitespace.
+
+        This is the code path used by :meth:`__str__`. Subclasses may override
+        it to avoid the overhead of nested generators. Keyword arguments (such
+        as *with_semicolon*) are passed on to :meth:`generate`; overrides that
+        have no use for them ignore them.
+        """
+        if indent:
+            pad = _indent(indent)
+            out += [(pad + line).rstrip() for line in self.generate(**kwargs)]
+        else:
+            out += [line.rstrip() for line in self.generate(**kwargs)]
+
 
 # {{{ declarators
 
 class Declarator(Generable, ABC):
-    def generate(self, with_semicolon: bool = True) -> Generator[str]:
+    __slots__ = ()
+
+    def _get_lines(self, with_semicolon: bool) -> list[str]:
         tp_lines, tp_decl = self.get_decl_pair()
-        tp_lines = list(tp_lines)
-        yield from tp_lines[:-1]
-        sc = ";"
-        if not with_semicolon:
-            sc = ""
+        lines = list(tp_lines)
+        sc = ";" if with_semicolon else ""
         if tp_decl is None:
-            yield f"{tp_lines[-1]}{sc}"
+            lines[-1] = f"{lines[-1]}{sc}"
         else:
-            yield f"{tp_lines[-1]} {tp_decl}{sc}"
+            lines[-1] = f"{lines[-1]} {tp_decl}{sc}"
+        return lines
+
+    def generate(self, with_semicolon: bool = True) -> Generator[str]:
+        yield from self._get_lines(with_semicolon)
+
+    def _emit(self, out: list[str], indent: int = 0,
+              with_semicolon: bool = True, **kwargs: Any) -> None:
+        pad = _indent(indent)
+        for line in self._get_lines(with_semicolon):
+            out.append((pad + line).rstrip())
 
     @abstractmethod
     def get_decl_pair(self) -> tuple[Sequence[str], str]:
@@ -141,12 +222,14 @@ class POD(Declarator):
     and the *name* is given as a string.
     """
 
+    __slots__ = ("dtype", "name")
+
     def __init__(self, dtype: numpy.dtype, name: str) -> None:
         self.dtype = numpy.dtype(dtype)
         self.name = name
 
     def get_decl_pair(self):
-        return [dtype_to_ctype(self.dtype)], self.name
+        return [_dtype_to_ctype_fast(self.dtype)], self.name
 
     def struct_maker_code(self, name):
         return name
@@ -155,7 +238,7 @@ class POD(Declarator):
         return self.dtype.char
 
     def alignment_requirement(self):
-        return _struct.calcsize(self.struct_format())
+        return _struct_for(self.struct_format()).size
 
     def default_value(self):
         return 0
@@ -166,6 +249,8 @@ class POD(Declarator):
 class Value(Declarator):
     """A simple declarator: *typename* and *name* are given as strings."""
 
+    __slots__ = ("name", "typename")
+
     def __init__(self, typename: str, name: str) -> None:
         self.typename = typename
         self.name = name
@@ -186,6 +271,8 @@ class Value(Declarator):
 
 
 class NestedDeclarator(Declarator):
+    __slots__ = ("subdecl",)
+
     def __init__(self, subdecl: Declarator) -> None:
         self.subdecl = subdecl
 
@@ -207,26 +294,23 @@ class NestedDeclarator(Declarator):
 
 
 class DeclSpecifier(NestedDeclarator):
+    __slots__ = ("sep", "spec")
+
     def __init__(self, subdecl: Declarator, spec, sep=" ") -> None:
         NestedDeclarator.__init__(self, subdecl)
         self.spec = spec
         self.sep = sep
 
     def get_decl_pair(self):
-        def add_spec(sub_it):
-            it = iter(sub_it)
-            try:
-                yield f"{self.spec}{self.sep}{next(it)}"
-            except StopIteration:
-                pass
-
-            yield from it
-
         sub_tp, sub_decl = self.subdecl.get_decl_pair()
-        return add_spec(sub_tp), sub_decl
+        if sub_tp:
+            return [f"{self.spec}{self.sep}{sub_tp[0]}", *sub_tp[1:]], sub_decl
+        return [], sub_decl
 
 
 class NamespaceQualifier(DeclSpecifier):
+    __slots__ = ()
+
     def __init__(self, namespace, subdecl):
         DeclSpecifier.__init__(self, subdecl, namespace, "::")
 
@@ -234,6 +318,8 @@ class NamespaceQualifier(DeclSpecifier):
 
 
 class Typedef(DeclSpecifier):
+    __slots__ = ()
+
     def __init__(self, subdecl):
         DeclSpecifier.__init__(self, subdecl, "typedef")
 
@@ -241,6 +327,8 @@ class Typedef(DeclSpecifier):
 
 
 class Static(DeclSpecifier):
+    __slots__ = ()
+
     def __init__(self, subdecl):
         DeclSpecifier.__init__(self, subdecl, "static")
 
@@ -248,22 +336,28 @@ class Static(DeclSpecifier):
 
 
 class Const(NestedDeclarator):
+    __slots__ = ()
+
     def get_decl_pair(self):
         sub_tp, sub_decl = self.subdecl.get_decl_pair()
-        return sub_tp, f"const {sub_decl}"
+        return sub_tp, "const " + sub_decl
 
     mapper_method = "map_const"
 
 
 class Volatile(NestedDeclarator):
+    __slots__ = ()
+
     def get_decl_pair(self):
         sub_tp, sub_decl = self.subdecl.get_decl_pair()
-        return sub_tp, f"volatile {sub_decl}"
+        return sub_tp, "volatile " + sub_decl
 
     mapper_method = "map_volatile"
 
 
 class Extern(DeclSpecifier):
+    __slots__ = ("language",)
+
     def __init__(self, language, subdecl):
         self.language = language
         super().__init__(subdecl, f'extern "{language}"')
@@ -272,6 +366,8 @@ class Extern(DeclSpecifier):
 
 
 class TemplateSpecializer(NestedDeclarator):
+    __slots__ = ("specializer",)
+
     def __init__(self, specializer, subdecl):
         self.specializer = specializer
         NestedDeclarator.__init__(self, subdecl)
@@ -285,9 +381,11 @@ class TemplateSpecializer(NestedDeclarator):
 
 
 class MaybeUnused(NestedDeclarator):
+    __slots__ = ()
+
     def get_decl_pair(self):
         sub_tp, sub_decl = self.subdecl.get_decl_pair()
-        return sub_tp, f"{sub_decl} __attribute__ ((unused))"
+        return sub_tp, sub_decl + " __attribute__ ((unused))"
 
     mapper_method = "map_maybe_unused"
 
@@ -296,6 +394,9 @@ class AlignedAttribute(NestedDeclarator):
     """
     Assigns an alignment for a definition of a type or an array.
     """
+
+    __slots__ = ("align_bytes",)
+
     def __init__(self, align_bytes, subdecl):
         super().__init__(subdecl)
         self.align_bytes = align_bytes
@@ -322,6 +423,9 @@ class AlignValueAttribute(NestedDeclarator):
     [1]: https://reviews.llvm.org/D4635
     [2]: https://www.intel.com/content/www/us/en/develop/documentation/oneapi-dpcpp-cpp-compiler-dev-guide-and-reference/top/compiler-reference/attributes/align-value.html
     """
+
+    __slots__ = ("align_bytes",)
+
     def __init__(self, align_bytes, subdecl):
         super().__init__(subdecl)
         self.align_bytes = align_bytes
@@ -335,12 +439,14 @@ class AlignValueAttribute(NestedDeclarator):
 
 
 class Pointer(NestedDeclarator):
+    __slots__ = ()
+
     def __init__(self, subdecl):
         NestedDeclarator.__init__(self, subdecl)
 
     def get_decl_pair(self):
         sub_tp, sub_decl = self.subdecl.get_decl_pair()
-        return sub_tp, f"*{sub_decl}"
+        return sub_tp, "*" + sub_decl
 
     def struct_maker_code(self, data):
         raise NotImplementedError
@@ -349,28 +455,34 @@ class Pointer(NestedDeclarator):
         return "P"
 
     def alignment_requirement(self):
-        return _struct.calcsize(self.struct_format())
+        return _struct_for(self.struct_format()).size
 
     mapper_method = "map_pointer"
 
 
 class RestrictPointer(Pointer):
+    __slots__ = ()
+
     def get_decl_pair(self):
         sub_tp, sub_decl = self.subdecl.get_decl_pair()
-        return sub_tp, f"*__restrict__ {sub_decl}"
+        return sub_tp, "*__restrict__ " + sub_decl
 
     mapper_method = "map_restrict_pointer"
 
 
 class Reference(Pointer):
+    __slots__ = ()
+
     def get_decl_pair(self):
         sub_tp, sub_decl = self.subdecl.get_decl_pair()
-        return sub_tp, f"&{sub_decl}"
+        return sub_tp, "&" + sub_decl
 
     mapper_method = "map_reference"
 
 
 class ArrayOf(NestedDeclarator):
+    __slots__ = ("count",)
+
     def __init__(self, subdecl: Declarator, count=None):
         NestedDeclarator.__init__(self, subdecl)
         self.count = count
@@ -384,7 +496,7 @@ class ArrayOf(NestedDeclarator):
         return sub_tp, (f"{sub_decl}[{count_str}]")
 
     def struct_maker_code(self, name):
-        return ", ".join(f"{name}[{i}]" for i in range(self.count))
+        return ", ".join([f"{name}[{i}]" for i in range(self.count)])
 
     def struct_format(self):
         if self.count is None:
@@ -402,6 +514,8 @@ class ArrayOf(NestedDeclarator):
 
 
 class FunctionDeclaration(NestedDeclarator):
+    __slots__ = ("arg_decls",)
+
     def __init__(self, subdecl: Declarator, arg_decls: Sequence[Declarator]):
         NestedDeclarator.__init__(self, subdecl)
         self.arg_decls = arg_decls
@@ -409,9 +523,8 @@ class FunctionDeclaration(NestedDeclarator):
     def get_decl_pair(self):
         sub_tp, sub_decl = self.subdecl.get_decl_pair()
 
-        return sub_tp, ("{}({})".format(
-            sub_decl,
-            ", ".join(ad.inline() for ad in self.arg_decls)))
+        args = ", ".join([ad.inline() for ad in self.arg_decls])
+        return sub_tp, f"{sub_decl}({args})"
 
     def struct_maker_code(self, data):
         raise RuntimeError("function pointers can't be put into structs")
@@ -429,6 +542,8 @@ class FunctionDeclaration(NestedDeclarator):
 class Struct(Declarator):
     """A structure declarator."""
 
+    __slots__ = ("declname", "fields", "pad_bytes", "tpname")
+
     def __init__(self, tpname, fields, declname=None, pad_bytes=0):
         """Initialize the structure declarator.
         *tpname* is the name of the structure, while *declname* is the
@@ -442,19 +557,16 @@ class Struct(Declarator):
         self.pad_bytes = pad_bytes
 
     def get_decl_pair(self):
-        def get_tp():
-            if self.tpname is not None:
-                yield f"struct {self.tpname}"
-            else:
-                yield "struct"
-            yield "{"
-            for f in self.fields:
-                for f_line in f.generate():
-                    yield f"  {f_line}"
-            if self.pad_bytes:
-                yield f"  unsigned char _cgen_pad[{self.pad_bytes}];"
-            yield "} " + self.struct_attributes()
-        return get_tp(), self.declname
+        if self.tpname is not None:
+            tp_lines = [f"struct {self.tpname}", "{"]
+        else:
+            tp_lines = ["struct", "{"]
+        for f in self.fields:
+            f._emit(tp_lines, 1)
+        if self.pad_bytes:
+            tp_lines.append(f"  unsigned char _cgen_pad[{self.pad_bytes}];")
+        tp_lines.append("} " + self.struct_attributes())
+        return tp_lines, self.declname
 
     def alignment_requirement(self):
         return max(f.alignment_requirement() for f in self.fields)
@@ -465,7 +577,15 @@ class Struct(Declarator):
     mapper_method = "map_struct"
 
 
+_GENERABLE_STRUCT_UNPICKLED_SLOTS = frozenset({
+        "_maker_cache", "_maker_with_defaults_cache"})
+
+
 class GenerableStruct(Struct):
+    __slots__ = (
+            "_maker_cache", "_maker_with_defaults_cache",
+            "align_bytes", "bytes", "format")
+
     def __init__(self, tpname, fields, declname=None,
             align_bytes=None, aligned_prime_to=None):
         """Initialize a structure declarator.
@@ -482,11 +602,9 @@ class GenerableStruct(Struct):
         numbers in *aligned_prime_to*. (Sounds obscure? It's needed
         for avoiding bank conflicts in CUDA programming.)
         """
-        if aligned_prime_to is None:
-            aligned_prime_to = []
 
-        format = "".join(f.struct_format() for f in fields)
-        bytes = _struct.calcsize(format)
+        format = "".join([f.struct_format() for f in fields])
+        bytes = _struct_for(format).size
 
         natural_align_bytes = max(f.alignment_requirement() for f in fields)
         if align_bytes is None:
@@ -498,17 +616,16 @@ class GenerableStruct(Struct):
 
         self.align_bytes = align_bytes
 
-        padded_bytes = ((bytes + align_bytes - 1) // align_bytes) * align_bytes
+        n_aligned_units = (bytes + align_bytes - 1) // align_bytes
+        if aligned_prime_to:
+            from math import gcd, lcm
 
-        def satisfies_primality(n):
-            import math
-            for p in aligned_prime_to:
-                if math.gcd(n, p) != 1:
-                    return False
-            return True
+            # n is prime to every entry iff it is prime to their lcm
+            prime_to = lcm(*aligned_prime_to)
+            while gcd(n_aligned_units, prime_to) != 1:
+                n_aligned_units += 1
 
-        while not satisfies_primality(padded_bytes // align_bytes):
-            padded_bytes += align_bytes
+        padded_bytes = n_aligned_units * align_bytes
 
         Struct.__init__(self, tpname, fields, declname, padded_bytes - bytes)
 
@@ -519,7 +636,7 @@ class GenerableStruct(Struct):
             self.format = format
             self.bytes = bytes
 
-        assert _struct.calcsize(self.format) == self.bytes
+        assert _struct_for(self.format).size == self.bytes
 
     # until nvcc bug is fixed
     # def struct_attributes(self):
@@ -533,7 +650,7 @@ class GenerableStruct(Struct):
         :class:`str` instance with members set to the values specified
         in *kwargs*.
         """
-        return self._maker()(_struct.pack, **kwargs)
+        return self._get_maker()(**kwargs)
 
     def make_with_defaults(self, **kwargs):
         """Build a binary, packed representation of *self* in a
@@ -542,9 +659,45 @@ class GenerableStruct(Struct):
 
         Unlike :meth:`make`, not all members have to occur in *kwargs*.
         """
-        return self._maker(with_defaults=True)(_struct.pack, **kwargs)
+        return self._get_maker(with_defaults=True)(**kwargs)
+
+    def __getstate__(self):
+        # The cached makers are eval'd lambdas, which cannot be pickled.
+        # Leave them out; they are rebuilt on first use.
+        slot_state = {}
+        for cls in type(self).__mro__:
+            for name in cls.__dict__.get("__slots__", ()):
+                if (name not in slot_state
+                        and name not in _GENERABLE_STRUCT_UNPICKLED_SLOTS
+                        and hasattr(self, name)):
+                    slot_state[name] = getattr(self, name)
+
+        return getattr(self, "__dict__", None) or None, slot_state
+
+    def make_many(self, records):
+        """Build the packed binary representations of several instances of
+        *self*, laid out back to back as in a C array. *records* is an iterable
+        of mappings, each of which specifies all members as in :meth:`make`.
+        """
+        maker = self._get_maker()
+        return b"".join([maker(**record) for record in records])
+
+    def _get_maker(self, with_defaults=False):
+        # The makers are built on first use and kept in slots.
+        if with_defaults:
+            try:
+                return self._maker_with_defaults_cache
+            except AttributeError:
+                maker = self._maker_with_defaults_cache = self._maker(
+                        with_defaults=True)
+                return maker
+        else:
+            try:
+                return self._maker_cache
+            except AttributeError:
+                maker = self._maker_cache = self._maker()
+                return maker
 
-    @memoize_method
     def _maker(self, with_defaults=False):
         def format_arg(f):
             if with_defaults:
@@ -552,11 +705,12 @@ class GenerableStruct(Struct):
             else:
                 return f.name
 
-        code = "lambda pack, {}: pack({}, {})".format(
+        # The field-flattening code comes from struct_maker_code, but the
+        # struct format is only parsed once, here.
+        code = "lambda {}: _cgen_pack({})".format(
                 ", ".join(format_arg(f) for f in self.fields),
-                repr(self.struct_format()),
                 ", ".join(f.struct_maker_code(f.name) for f in self.fields))
-        return eval(code)
+        return eval(code, {"_cgen_pack": _struct_for(self.struct_format()).pack})
 
     def struct_format(self):
         """Return the format of the struct as digested by the :mod:`struct`
@@ -593,21 +747,35 @@ class Enum(Generable):
         enum value.
     """
 
+    __slots__ = ()
+
     c_name: str
     dtype: numpy.dtype[Any]
     c_value_prefix: str
 
+    @classmethod
+    def _get_flag_names_and_values(cls):
+        # Look at the class __dict__ only, so that subclasses do not pick up
+        # their base's cached flags.
+        result = cls.__dict__.get("_cgen_flags")
+        if result is None:
+            result = tuple(
+                    (name, getattr(cls, name))
+                    for name in sorted(dir(cls))
+                    if name[0].isupper())
+            cls._cgen_flags = result
+
+        return result
+
     @classmethod
     def get_flag_names_and_values(cls):
-        return [(name, getattr(cls, name))
-                for name in sorted(dir(cls))
-                if name[0].isupper()]
+        return list(cls._get_flag_names_and_values())
 
     @classmethod
     def get_c_defines_lines(cls):
         return [
                 f"#define {cls.c_value_prefix}{flag_name} {value}"
-                for flag_name, value in cls.get_flag_names_and_values()]
+                for flag_name, value in cls._get_flag_names_and_values()]
 
     @classmethod
     def get_c_defines(cls):
@@ -636,10 +804,13 @@ class Enum(Generable):
     def stringify_value(cls, val):
         """Return a string description of the flags set in *val*."""
 
-        return "|".join(
+        if not val:
+            return ""
+
+        return "|".join([
                 flag_name
-                for flag_name, flag_value in cls.get_flag_names_and_values()
-                if val & flag_value)
+                for flag_name, flag_value in cls._get_flag_names_and_values()
+                if val & flag_value])
 
 # }}}
 
@@ -647,6 +818,8 @@ class Enum(Generable):
 # {{{ template
 
 class Template(NestedDeclarator):
+    __slots__ = ("template_spec",)
+
     def __init__(self, template_spec, subdecl):
         self.template_spec = template_spec
         self.subdecl = subdecl
@@ -663,6 +836,8 @@ class Template(NestedDeclarator):
 # {{{ control flow/statement stuff
 
 class If(Generable):
+    __slots__ = ("condition", "else_", "then_")
+
     def __init__(self, condition, then_, else_=None):
         self.condition = condition
 
@@ -675,35 +850,53 @@ class If(Generable):
 
     def generate(self):
         cond_str = str(self.condition)
-        condition_lines = cond_str.split("\n")
-        if len(condition_lines) > 1:
+        if "\n" in cond_str:
             yield "if ("
-            for line in condition_lines:
-                yield f"    {line}"
+            for line in cond_str.split("\n"):
+                yield "    " + line
             yield "  )"
         else:
-            yield f"if ({self.condition})"
+            yield f"if ({cond_str})"
 
         if isinstance(self.then_, Block):
-            for line in self.then_.generate():
-                yield line
+            yield from self.then_.generate()
         else:
             for line in self.then_.generate():
-                yield f"  {line}"
+                yield "  " + line
 
         if self.else_ is not None:
             yield "else"
             if isinstance(self.else_, Block):
-                for line in self.else_.generate():
-                    yield line
+                yield from self.else_.generate()
             else:
                 for line in self.else_.generate():
-                    yield f"  {line}"
+                    yield "  " + line
+
+    def _emit(self, out: list[str], indent: int = 0, **kwargs: Any) -> None:
+        pad = _indent(indent)
+        cond_str = str(self.condition)
+        if "\n" in cond_str:
+            out.append(pad + "if (")
+            for line in cond_str.split("\n"):
+                out.append(f"{pad}    {line}".rstrip())
+            out.append(pad + "  )")
+        else:
+            out.append(f"{pad}if ({cond_str})".rstrip())
+
+        self.then_._emit(out,
+                indent if isinstance(self.then_, Block) else indent + 1)
+
+        if self.else_ is not None:
+            out.append(pad + "else")
+            self.else_._emit(out,
+                    indent if isinstance(self.else_, Block) else indent + 1)
 
     mapper_method = "map_if"
 
 
 class Loop(Generable):
+    __slots__ = ("body",)
+
     def __init__(self, body):
         self.body = body
 
@@ -711,24 +904,40 @@ class Loop(Generable):
         raise NotImplementedError
 
     def generate(self):
-        if self.intro_line() is not None:
-            yield self.intro_line()
+        intro_line = self.intro_line()
+        if intro_line is not None:
+            yield intro_line
 
         if isinstance(self.body, Block):
-            for line in self.body.generate():
-                yield line
+            yield from self.body.generate()
         else:
             for line in self.body.generate():
                 yield "  "+line
 
-        if self.outro_line() is not None:
-            yield self.outro_line()
+        outro_line = self.outro_line()
+        if outro_line is not None:
+            yield outro_line
+
+    def _emit(self, out: list[str], indent: int = 0, **kwargs: Any) -> None:
+        pad = _indent(indent)
+        intro_line = self.intro_line()
+        if intro_line is not None:
+            out.append((pad + intro_line).rstrip())
+
+        self.body._emit(out,
+                indent if isinstance(self.body, Block) else indent + 1)
+
+        outro_line = self.outro_line()
+        if outro_line is not None:
+            out.append((pad + outro_line).rstrip())
 
     def outro_line(self):
         return None
 
 
 class CustomLoop(Loop):
+    __slots__ = ("intro_line_", "outro_line_")
+
     def __init__(self, intro_line, body, outro_line=None):
         self.intro_line_ = intro_line
         self.body = body
@@ -744,6 +953,8 @@ class CustomLoop(Loop):
 
 
 class While(Loop):
+    __slots__ = ("condition",)
+
     def __init__(self, condition, body):
         self.condition = condition
         assert isinstance(body, Generable)
@@ -756,6 +967,8 @@ class While(Loop):
 
 
 class For(Loop):
+    __slots__ = ("condition", "start", "update")
+
     def __init__(self, start, condition, update, body):
         self.start = start
         self.condition = condition
@@ -771,6 +984,8 @@ class For(Loop):
 
 
 class DoWhile(Loop):
+    __slots__ = ("condition",)
+
     def __init__(self, condition, body):
         self.condition = condition
         assert isinstance(body, Generable)
@@ -787,10 +1002,16 @@ class DoWhile(Loop):
 
 def make_multiple_ifs(conditions_and_blocks, base=None):
     if base == "last":
-        _, base = conditions_and_blocks[-1]
-        conditions_and_blocks = conditions_and_blocks[:-1]
+        if not conditions_and_blocks:
+            raise ValueError("base='last' requires at least one "
+                    "condition and block")
+
+        conditions_and_blocks = reversed(conditions_and_blocks)
+        _, base = next(conditions_and_blocks)
+    else:
+        conditions_and_blocks = reversed(conditions_and_blocks)
 
-    for cond, block in conditions_and_blocks[::-1]:
+    for cond, block in conditions_and_blocks:
         base = If(cond, block, base)
     return base
 
@@ -799,121 +1020,174 @@ def make_multiple_ifs(conditions_and_blocks, base=None):
 
 # {{{ simple statements
 
-class Define(Generable):
+class _SingleLineGenerable(Generable):
+    """A code construct that always consists of exactly one line, given by
+    :meth:`_line`.
+    """
+
+    __slots__ = ()
+
+    @abstractmethod
+    def _line(self) -> str:
+        """Return the line making up this code construct."""
+
+    def generate(self):
+        yield self._line()
+
+    def _emit(self, out: list[str], indent: int = 0, **kwargs: Any) -> None:
+        out.append((_indent(indent) + self._line()).rstrip())
+
+    def __str__(self) -> str:
+        return self._line().rstrip()
+
+
+class Define(_SingleLineGenerable):
+    __slots__ = ("symbol", "value")
+
     def __init__(self, symbol, value):
         self.symbol = symbol
         self.value = value
 
-    def generate(self):
-        yield f"#define {self.symbol} {self.value}"
+    def _line(self):
+        return f"#define {self.symbol} {self.value}"
 
     mapper_method = "map_define"
 
 
-class Include(Generable):
+class Include(_SingleLineGenerable):
+    __slots__ = ("filename", "system")
+
     def __init__(self, filename, system=True):
         self.filename = filename
         self.system = system
 
-    def generate(self):
+    def _line(self):
         if self.system:
-            yield f"#include <{self.filename}>"
+            return f"#include <{self.filename}>"
         else:
-            yield f'#include "{self.filename}"'
+            return f'#include "{self.filename}"'
 
     mapper_method = "map_include"
 
 
-class Pragma(Generable):
+class Pragma(_SingleLineGenerable):
+    __slots__ = ("value",)
+
     def __init__(self, value):
         self.value = value
 
-    def generate(self):
-        yield f"#pragma {self.value}"
+    def _line(self):
+        return f"#pragma {self.value}"
 
     mapper_method = "map_pragma"
 
 
-class Statement(Generable):
+class Statement(_SingleLineGenerable):
+    __slots__ = ("text",)
+
     def __init__(self, text: str) -> None:
         self.text = text
 
-    def generate(self):
-        yield self.text+";"
+    def _line(self):
+        return self.text+";"
 
     mapper_method = "map_statement"
 
 
-class ExpressionStatement(Generable):
+class ExpressionStatement(_SingleLineGenerable):
+    __slots__ = ("expr",)
+
     def __init__(self, expr):
         self.expr = expr
 
-    def generate(self):
-        yield str(self.expr)+";"
+    def _line(self):
+        return str(self.expr)+";"
 
     mapper_method = "map_expression_statement"
 
 
-class Assign(Generable):
+class Assign(_SingleLineGenerable):
+    __slots__ = ("lvalue", "rvalue")
+
     def __init__(self, lvalue, rvalue):
         self.lvalue = lvalue
         self.rvalue = rvalue
 
-    def generate(self):
-        yield f"{self.lvalue} = {self.rvalue};"
+    def _line(self):
+        return f"{self.lvalue} = {self.rvalue};"
 
     mapper_method = "map_assignment"
 
 
-class Line(Generable):
+class Line(_SingleLineGenerable):
+    __slots__ = ("text",)
+
     def __init__(self, text=""):
         self.text = text
 
-    def generate(self):
-        yield self.text
+    def _line(self):
+        return self.text
 
     mapper_method = "map_line"
 
 
-class Comment(Generable):
+_COMMENT_FMT = "/* {text} */"
+_COMMENT_FMT_SKIP_SPACE = "/*{text}*/"
+
+
+class Comment(_SingleLineGenerable):
+    __slots__ = ("fmt_str", "text")
+
     def __init__(self, text, skip_space=False):
         self.text = text
         if skip_space:
-            self.fmt_str = "/*{text}*/"  # noqa: RUF027
+            self.fmt_str = _COMMENT_FMT_SKIP_SPACE
         else:
-            self.fmt_str = "/* {text} */"  # noqa: RUF027
-
-    def generate(self):
-        yield self.fmt_str.format(text=self.text)
+            self.fmt_str = _COMMENT_FMT
+
+    def _line(self):
+        # Spell out the two built-in formats as f-strings, which avoids
+        # parsing the format string on every render.
+        fmt_str = self.fmt_str
+        if fmt_str is _COMMENT_FMT:
+            return f"/* {self.text} */"
+        elif fmt_str is _COMMENT_FMT_SKIP_SPACE:
+            return f"/*{self.text}*/"
+        else:
+            return fmt_str.format(text=self.text)
 
     mapper_method = "map_comment"
 
 
 class MultilineComment(Generable):
+    __slots__ = ("skip_space", "text")
+
     def __init__(self, text, skip_space=False):
         self.text = text
         self.skip_space = skip_space
 
     def generate(self):
-        yield "/**"
         if self.skip_space is True:
             line_begin, comment_end = "*", "*/"
         else:
             line_begin, comment_end = " * ", " */"
-        for line in self.text.splitlines():
-            yield line_begin + line
-        yield comment_end
+        return chain(
+                ("/**",),
+                [line_begin + line for line in self.text.splitlines()],
+                (comment_end,))
 
     mapper_method = "map_multiline_comment"
 
 
-class LineComment(Generable):
+class LineComment(_SingleLineGenerable):
+    __slots__ = ("text",)
+
     def __init__(self, text):
         assert "\n" not in text
         self.text = text
 
-    def generate(self):
-        yield f"// {self.text}"
+    def _line(self):
+        return "// " + self.text
 
     mapper_method = "map_line_comment"
 
@@ -923,9 +1197,7 @@ def add_comment(comment, stmt):
         return stmt
 
     if isinstance(stmt, Block):
-        result = Block([Comment(comment), Line()])
-        result.extend(stmt.contents)
-        return result
+        return Block([Comment(comment), Line(), *stmt.contents])
     else:
         return Block([Comment(comment), Line(), stmt])
 
@@ -935,24 +1207,24 @@ def add_comment(comment, stmt):
 # {{{ initializers
 
 class Initializer(Generable):
+    __slots__ = ("data", "vdecl")
+
     def __init__(self, vdecl, data):
         self.vdecl = vdecl
         self.data = data
 
-    def generate(self):
+    def generate(self, with_semicolon=True):
+        sc = ";" if with_semicolon else ""
         tp_lines, tp_decl = self.vdecl.get_decl_pair()
-        tp_lines = list(tp_lines)
         yield from tp_lines[:-1]
         if isinstance(self.data, str) and "\n" in self.data:
             data_lines = self.data.split("\n")
             yield f"{tp_lines[-1]} {tp_decl} ="
-            for i, line in enumerate(data_lines):
-                if i == len(data_lines)-1:
-                    yield f"  {line};"
-                else:
-                    yield f"  {line}"
+            for line in data_lines[:-1]:
+                yield "  " + line
+            yield f"  {data_lines[-1]}{sc}"
         else:
-            yield f"{tp_lines[-1]} {tp_decl} = {self.data};"
+            yield f"{tp_lines[-1]} {tp_decl} = {self.data}{sc}"
 
     mapper_method = "map_initializer"
 
@@ -964,13 +1236,11 @@ class InlineInitializer(Initializer):
     Usage: same as cgen.Initializer
     Result: same as cgen.Initializer except for the lack of a semi-colon at the end
     """
+
+    __slots__ = ()
+
     def generate(self):
-        result = super().generate()
-        for v in result:
-            if v.endswith(";"):
-                yield v[:-1]
-            else:
-                yield v
+        return super().generate(with_semicolon=False)
 
 
 def Constant(vdecl, data):  # noqa
@@ -978,18 +1248,23 @@ def Constant(vdecl, data):  # noqa
 
 
 class ArrayInitializer(Generable):
+    __slots__ = ("data", "vdecl")
+
     def __init__(self, vdecl, data):
         self.vdecl = vdecl
         self.data = data
 
     def generate(self):
         yield from self.vdecl.generate(with_semicolon=False)
-        yield "  = { %s };" % (", ".join(str(item) for item in self.data))
+        data = ", ".join([str(item) for item in self.data])
+        yield f"  = {{ {data} }};"
 
     mapper_method = "map_array_initializer"
 
 
 class FunctionBody(Generable):
+    __slots__ = ("body", "fdecl")
+
     def __init__(self, fdecl, body):
         """Initialize a function definition. *fdecl* is expected to be
         a :class:`FunctionDeclaration` instance, while *body* is a
@@ -1003,6 +1278,10 @@ class FunctionBody(Generable):
         yield from self.fdecl.generate(with_semicolon=False)
         yield from self.body.generate()
 
+    def _emit(self, out: list[str], indent: int = 0, **kwargs: Any) -> None:
+        self.fdecl._emit(out, indent, with_semicolon=False)
+        self.body._emit(out, indent)
+
     mapper_method = "map_function_body"
 
 # }}}
@@ -1010,23 +1289,46 @@ class FunctionBody(Generable):
 
 # {{{ block
 
+_EMPTY_BLOCK_LINES = ("{", "}")
+
+
 class Block(Generable):
+    """A brace-delimited block of :class:`Generable` items."""
+
+    __slots__ = ("contents",)
+
     def __init__(self, contents=None):
         if contents is None:
             contents = []
         if isinstance(contents, Block):
             contents = contents.contents
-        self.contents = contents[:]
+        self._take_contents(contents[:])
 
-        for item in contents:
-            assert isinstance(item, Generable)
+    def _take_contents(self, contents):
+        # Use the list *contents* itself, without copying it. Only for lists
+        # that nobody else holds a reference to.
+        self.contents = contents
+
+        if __debug__:
+            for item in contents:
+                assert isinstance(item, Generable)
 
     def generate(self):
-        yield "{"
+        if not self.contents:
+            return iter(_EMPTY_BLOCK_LINES)
+
+        return chain(
+                ("{",),
+                ["  " + item_line
+                    for item in self.contents for item_line in item.generate()],
+                ("}",))
+
+    def _emit(self, out: list[str], indent: int = 0, **kwargs: Any) -> None:
+        pad = _indent(indent)
+        out.append(pad + "{")
         for item in self.contents:
-            for item_line in item.generate():
-                yield f"  {item_line}"
-        yield "}"
+            item._emit(out, indent + 1)
+        out.append(pad + "}")
 
     def append(self, data):
         self.contents.append(data)
@@ -1053,6 +1355,8 @@ def block_if_necessary(contents):
 
 
 class LiteralLines(Generable):
+    __slots__ = ("lines",)
+
     def __init__(self, text):
         # accommodate pyopencl syntax highlighting
         if text.startswith("//CL//"):
@@ -1063,45 +1367,69 @@ class LiteralLines(Generable):
                     "in literal lines")
 
         lines = text.split("\n")
-        while lines[0].strip() == "":
-            lines.pop(0)
-        while lines[-1].strip() == "":
-            lines.pop(-1)
 
-        if lines:
-            base_indent = 0
-            while lines[0][base_indent] in " \t":
-                base_indent += 1
+        start, end = 0, len(lines)
+        while not lines[start].strip():
+            start += 1
+        while not lines[end-1].strip():
+            end -= 1
+        lines = lines[start:end]
 
+        first_line = lines[0]
+        base_indent = len(first_line) - len(first_line.lstrip(" \t"))
+
+        if base_indent:
+            # The first base_indent characters of every other line must be
+            # whitespace, though not necessarily the same whitespace.
             for line in lines[1:]:
-                if line[:base_indent].strip():
+                content = line.lstrip()
+                if content and len(line) - len(content) < base_indent:
                     raise ValueError("inconsistent indentation")
 
-        self.lines = [line[base_indent:] for line in lines]
+            lines = [line[base_indent:] for line in lines]
+
+        self.lines = lines
 
     def generate(self):
         yield from self.lines
 
+    def _emit(self, out: list[str], indent: int = 0, **kwargs: Any) -> None:
+        if indent:
+            pad = _indent(indent)
+            out += [(pad + line).rstrip() for line in self.lines]
+        else:
+            out += [line.rstrip() for line in self.lines]
+
     mapper_method = "map_literal_lines"
 
 
 class LiteralBlock(LiteralLines):
+    __slots__ = ()
+
     def generate(self):
-        yield "{"
-        for line in self.lines:
-            yield f"  {line}"
-        yield "}"
+        return chain(("{",), ["  " + line for line in self.lines], ("}",))
 
 
 class Collection(Block):
+    __slots__ = ()
+
     def generate(self):
+        return chain.from_iterable(c.generate() for c in self.contents)
+
+    def _emit(self, out: list[str], indent: int = 0, **kwargs: Any) -> None:
         for c in self.contents:
-            yield from c.generate()
+            c._emit(out, indent)
 
 
 Module = Collection
 
 
+# Shared by all IfDef/IfNDef instances. Line nodes are never modified by cgen,
+# so aliasing them is safe.
+_LINE_ELSE = Line("#else")
+_LINE_ENDIF = Line("#endif")
+
+
 class IfDef(Module):
     """
     Class to represent IfDef-Else-EndIf construct for the C preprocessor.
@@ -1109,13 +1437,16 @@ class IfDef(Module):
     :param iflines: the block of code inside the if [an array of type Generable]
     :param elselines: the block of code inside the else [an array of type Generable]
     """
+
+    __slots__ = ()
+
     def __init__(self, condition, iflines, elselines):
-        ifdef_line = Line(f"#ifdef {condition}")
-        if len(elselines):
-            elselines.insert(0, Line("#else"))
-        endif_line = Line("#endif")
-        lines = [ifdef_line, *iflines, *elselines, endif_line]
-        super().__init__(lines)
+        lines = [Line(f"#ifdef {condition}"), *iflines]
+        if elselines:
+            lines.append(_LINE_ELSE)
+            lines.extend(elselines)
+        lines.append(_LINE_ENDIF)
+        self._take_contents(lines)
 
     mapper_method = "map_ifdef"
 
@@ -1128,36 +1459,52 @@ class IfNDef(Module):
         [an array of type Generable]
     :param elselines: the block of code inside the else [an array of type Generable]
     """
+
+    __slots__ = ()
+
     def __init__(self, condition, ifndeflines, elselines):
-        ifndefdef_line = Line(f"#ifndef {condition}")
-        if len(elselines):
-            elselines.insert(0, Line("#else"))
-        lines = [ifndefdef_line, *ifndeflines, *elselines, Line("#endif")]
-        super().__init__(lines)
+        lines = [Line(f"#ifndef {condition}"), *ifndeflines]
+        if elselines:
+            lines.append(_LINE_ELSE)
+            lines.extend(elselines)
+        lines.append(_LINE_ENDIF)
+        self._take_contents(lines)
 
     mapper_method = "map_ifndef"
 
 
 class PrivateNamespace(Block):
-    def get_namespace_name(self):
-        import hashlib
-        checksum = hashlib.md5()
+    """A C++ namespace named after a checksum of its contents, followed by a
+    ``using namespace`` directive for it.
+    """
 
-        for c in self.contents:
-            for line in c.generate():
-                checksum.update(line.encode("utf-8"))
+    __slots__ = ()
+
+    def _get_content_lines(self):
+        return [line for c in self.contents for line in c.generate()]
+
+    @staticmethod
+    def _get_namespace_name(content_lines):
+        # Hashing the concatenation in one update() gives the same digest as
+        # feeding the lines one by one. The digest only names the namespace.
+        checksum = hashlib.blake2b(
+                "".join(content_lines).encode("utf-8"),
+                digest_size=16, usedforsecurity=False)
 
         return "private_namespace_"+checksum.hexdigest()
 
+    def get_namespace_name(self):
+        return self._get_namespace_name(self._get_content_lines())
+
     def generate(self):
-        yield "namespace "+self.get_namespace_name()
-        yield "{"
-        for item in self.contents:
-            for item_line in item.generate():
-                yield f"  {item_line}"
-        yield "}"
-        yield ""
-        yield f"using namespace {self.get_namespace_name()};"
+        # Generate the contents only once, for both the checksum and the body.
+        content_lines = self._get_content_lines()
+        namespace_name = self._get_namespace_name(content_lines)
+
+        return chain(
+                ("namespace "+namespace_name, "{"),
+                ["  " + item_line for item_line in content_lines],
+                ("}", "", f"using namespace {namespace_name};"))
 
 # }}}
 
@@ -23,6 +23,8 @@ from cgen import DeclSpecifier, NestedDeclarator, Pointer
 
 
 class CudaGlobal(DeclSpecifier):
+    __slots__ = ()
+
     def __init__(self, subdecl):
         DeclSpecifier.__init__(self, subdecl, "__global__")
 
@@ -30,6 +32,8 @@ class CudaGlobal(DeclSpecifier):
 
 
 class CudaDevice(DeclSpecifier):
+    __slots__ = ()
+
     def __init__(self, subdecl):
         DeclSpecifier.__init__(self, subdecl, "__device__")
 
@@ -37,6 +41,8 @@ class CudaDevice(DeclSpecifier):
 
 
 class CudaShared(DeclSpecifier):
+    __slots__ = ()
+
     def __init__(self, subdecl):
         DeclSpecifier.__init__(self, subdecl, "__shared__")
 
@@ -44,6 +50,8 @@ class CudaShared(DeclSpecifier):
 
 
 class CudaConstant(DeclSpecifier):
+    __slots__ = ()
+
     def __init__(self, subdecl):
         DeclSpecifier.__init__(self, subdecl, "__constant__")
 
@@ -51,6 +59,8 @@ class CudaConstant(DeclSpecifier):
 
 
 class CudaRestrictPointer(Pointer):
+    __slots__ = ()
+
     def get_decl_pair(self):
         sub_tp, sub_decl = self.subdecl.get_decl_pair()
         return sub_tp, f"*__restrict__ {sub_decl}"
@@ -59,6 +69,8 @@ class CudaRestrictPointer(Pointer):
 
 
 class CudaLaunchBounds(NestedDeclarator):
+    __slots__ = ("max_threads_per_block", "min_blocks_per_mp")
+
     def __init__(self, max_threads_per_block, subdecl, min_blocks_per_mp=None):
         self.max_threads_per_block = max_threads_per_block
         self.min_blocks_per_mp = min_blocks_per_mp
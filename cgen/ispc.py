@@ -24,6 +24,8 @@ from cgen import DeclSpecifier, Pointer, Statement
 
 
 class ISPCVarying(DeclSpecifier):
+    __slots__ = ()
+
     def __init__(self, subdecl):
         DeclSpecifier.__init__(self, subdecl, "varying")
 
@@ -31,6 +33,8 @@ class ISPCVarying(DeclSpecifier):
 
 
 class ISPCUniform(DeclSpecifier):
+    __slots__ = ()
+
     def __init__(self, subdecl):
         DeclSpecifier.__init__(self, subdecl, "uniform")
 
@@ -38,6 +42,8 @@ class ISPCUniform(DeclSpecifier):
 
 
 class ISPCExport(DeclSpecifier):
+    __slots__ = ()
+
     def __init__(self, subdecl):
         DeclSpecifier.__init__(self, subdecl, "export")
 
@@ -45,6 +51,8 @@ class ISPCExport(DeclSpecifier):
 
 
 class ISPCTask(DeclSpecifier):
+    __slots__ = ()
+
     def __init__(self, subdecl):
         DeclSpecifier.__init__(self, subdecl, "task")
 
@@ -52,6 +60,8 @@ class ISPCTask(DeclSpecifier):
 
 
 class ISPCVaryingPointer(Pointer):
+    __slots__ = ()
+
     def get_decl_pair(self):
         sub_tp, sub_decl = self.subdecl.get_decl_pair()
         return sub_tp, f"*varying {sub_decl}"
@@ -60,6 +70,8 @@ class ISPCVaryingPointer(Pointer):
 
 
 class ISPCUniformPointer(Pointer):
+    __slots__ = ()
+
     def get_decl_pair(self):
         sub_tp, sub_decl = self.subdecl.get_decl_pair()
         return sub_tp, f"*uniform {sub_decl}"
@@ -68,6 +80,8 @@ class ISPCUniformPointer(Pointer):
 
 
 class ISPCLaunch(Statement):
+    __slots__ = ("expr", "grid")
+
     def __init__(self, grid, expr):
         self.grid = grid
         self.expr = expr
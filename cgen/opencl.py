@@ -20,7 +20,7 @@ THE SOFTWARE.
 
 import numpy as np
 
-from cgen import Declarator, DeclSpecifier, NestedDeclarator, Value
+from cgen import Declarator, DeclSpecifier, NestedDeclarator, Value, _struct_for
 
 
 def dtype_to_cltype(dtype):
@@ -55,6 +55,8 @@ def dtype_to_cltype(dtype):
 # {{{ kernel
 
 class CLKernel(DeclSpecifier):
+    __slots__ = ()
+
     def __init__(self, subdecl):
         DeclSpecifier.__init__(self, subdecl, "__kernel")
 
@@ -66,6 +68,8 @@ class CLKernel(DeclSpecifier):
 # {{{ kernel args
 
 class CLConstant(DeclSpecifier):
+    __slots__ = ()
+
     def __init__(self, subdecl):
         DeclSpecifier.__init__(self, subdecl, "__constant")
 
@@ -73,6 +77,8 @@ class CLConstant(DeclSpecifier):
 
 
 class CLLocal(DeclSpecifier):
+    __slots__ = ()
+
     def __init__(self, subdecl):
         DeclSpecifier.__init__(self, subdecl, "__local")
 
@@ -80,6 +86,8 @@ class CLLocal(DeclSpecifier):
 
 
 class CLGlobal(DeclSpecifier):
+    __slots__ = ()
+
     def __init__(self, subdecl):
         DeclSpecifier.__init__(self, subdecl, "__global")
 
@@ -87,6 +95,8 @@ class CLGlobal(DeclSpecifier):
 
 
 class CLImage(Value):
+    __slots__ = ()
+
     def __init__(self, dims, mode, name):
         if mode == "r":
             spec = "__read_only"
@@ -105,6 +115,8 @@ class CLImage(Value):
 # {{{ function attributes
 
 class CLVecTypeHint(NestedDeclarator):
+    __slots__ = ("type_str",)
+
     def __init__(self, subdecl, dtype=None, count=None, type_str=None):
         if (dtype is None) != (count is None):
             raise ValueError("dtype and count must always be "
@@ -130,6 +142,8 @@ class CLVecTypeHint(NestedDeclarator):
 
 
 class _CLWorkGroupSizeDeclarator(NestedDeclarator):
+    __slots__ = ("dim",)
+
     def __init__(self, dim, subdecl):
         NestedDeclarator.__init__(self, subdecl)
 
@@ -143,6 +157,9 @@ class CLWorkGroupSizeHint(_CLWorkGroupSizeDeclarator):
     """
     See Sec 6.7.2 of OpenCL 2.0 spec, Version V2.2-11.
     """
+
+    __slots__ = ()
+
     def get_decl_pair(self):
         sub_tp, sub_decl = self.subdecl.get_decl_pair()
         return sub_tp, ("__attribute__ ((work_group_size_hint({}))) {}".format(
@@ -155,6 +172,9 @@ class CLRequiredWorkGroupSize(_CLWorkGroupSizeDeclarator):
     """
     See Sec 6.7.2 of OpenCL 2.0 spec, Version V2.2-11.
     """
+
+    __slots__ = ()
+
     def get_decl_pair(self):
         sub_tp, sub_decl = self.subdecl.get_decl_pair()
         return sub_tp, ("__attribute__ ((reqd_work_group_size({}))) {}".format(
@@ -168,6 +188,8 @@ class CLRequiredWorkGroupSize(_CLWorkGroupSizeDeclarator):
 # {{{ vector PODs
 
 class CLVectorPOD(Declarator):
+    __slots__ = ("count", "dtype", "name")
+
     def __init__(self, dtype, count, name):
         self.dtype = np.dtype(dtype)
         self.count = count
@@ -183,8 +205,7 @@ class CLVectorPOD(Declarator):
         return str(self.count)+self.dtype.char
 
     def alignment_requirement(self):
-        from struct import calcsize
-        return calcsize(self.struct_format())
+        return _struct_for(self.struct_format()).size
 
     def default_value(self):
         return [0]*self.count
@@ -1,4 +1,9 @@
+import copy
+import pickle
+import struct
+
 import numpy as np
+import pytest
 
 from cgen import (
     POD,
@@ -6,13 +11,28 @@ from cgen import (
     Assign,
     Block,
     Comment,
+    Const,
+    Enum,
     For,
     FunctionBody,
     FunctionDeclaration,
+    GenerableStruct,
     If,
+    IfDef,
+    IfNDef,
+    Initializer,
+    InlineInitializer,
+    LiteralLines,
+    Pointer,
+    PrivateNamespace,
+    Statement,
+    Static,
     Struct,
     Template,
+    TemplateSpecializer,
     Value,
+    dtype_to_ctype,
+    make_multiple_ifs,
 )
 
 
@@ -57,3 +77,234 @@ def test_cgen():
     print(s)
     print(f_body)
     print(t_decl)
+
+
+def test_generate_override_respected():
+    class Custom(Block):
+        def generate(self):
+            yield "custom {"
+            yield from super().generate()
+
+    blk = Block([If("x", Custom([Assign("a", "b")]))])
+    assert str(blk) == "\n".join(line.rstrip() for line in blk.generate())
+    assert "  custom {" in str(blk).split("\n")
+
+    class Shout(Statement):
+        def generate(self):
+            yield self.text.upper() + ";"
+
+    assert str(Shout("x")) == "X;"
+    assert str(Block([Shout("x")])) == "{\n  X;\n}"
+
+    # generate() supplied by a plain mixin that precedes the cgen base
+    class Mix:
+        def generate(self):
+            yield "mixin"
+
+    class MixedStatement(Mix, Statement):
+        pass
+
+    assert str(MixedStatement("x")) == "mixin"
+    assert str(Block([MixedStatement("x")])) == "{\n  mixin\n}"
+
+    # ...but not one that comes after a class providing its own _emit()
+    class Late(Statement, Mix):
+        pass
+
+    assert str(Late("x")) == "x;"
+
+
+def test_single_line_generable_requires_line():
+    from cgen import _SingleLineGenerable
+
+    class NoLine(_SingleLineGenerable):
+        pass
+
+    with pytest.raises(TypeError):
+        NoLine()
+
+
+def test_decl_pair_not_shared():
+    decl = POD(np.float32, "x")
+    spec = TemplateSpecializer("int", decl)
+    assert str(spec) == "float<int> x;"
+    assert str(spec) == "float<int> x;"
+    assert str(decl) == "float x;"
+
+
+def test_declarator_changes_after_render():
+    v = Value("int", "x")
+    f = FunctionDeclaration(Pointer(v), [])
+    assert str(f) == "int *x();"
+    v.name = "y"
+    f.arg_decls.append(POD(np.float32, "a"))
+    assert str(f) == "int *y(float a);"
+
+    pod = POD(np.float32, "x")
+    arr = Const(ArrayOf(pod, 3))
+    assert str(arr) == "float const x[3];"
+    pod.name = "z"
+    arr.subdecl.count = 4
+    assert str(arr) == "float const z[4];"
+
+
+def test_decl_specifier_type_lines():
+    decl = TemplateSpecializer("int", Static(Value("vector", "v")))
+    assert str(decl) == "static vector<int> v;"
+    assert str(decl) == "static vector<int> v;"
+
+
+def test_generable_struct_make():
+    s = GenerableStruct("gs", [
+        POD(np.float32, "a"),
+        ArrayOf(POD(np.int16, "arr"), 3),
+        ], align_bytes=16)
+    assert len(s) == 16
+    assert s.make(a=1.5, arr=[1, 2, 3]) == struct.pack(s.format, 1.5, 1, 2, 3)
+    assert s.make_with_defaults(a=2) == struct.pack(s.format, 2, 0, 0, 0)
+    assert s.make_many([
+        {"a": 1.5, "arr": [1, 2, 3]},
+        {"a": 2, "arr": [4, 5, 6]},
+        ]) == s.make(a=1.5, arr=[1, 2, 3]) + s.make(a=2, arr=[4, 5, 6])
+    assert s.make_many([]) == b""
+
+    s_copy = pickle.loads(pickle.dumps(s))
+    assert s_copy.format == s.format
+    assert str(s_copy) == str(s)
+    assert s_copy.make(a=1.5, arr=[1, 2, 3]) == s.make(a=1.5, arr=[1, 2, 3])
+    assert copy.deepcopy(s).make_with_defaults(a=2) == s.make_with_defaults(a=2)
+
+
+def test_enum_flags():
+    class Base(Enum):
+        c_name = "base_t"
+        dtype = np.dtype(np.int32)
+        c_value_prefix = "BASE_"
+
+        A = 1
+        B = 2
+
+    class Derived(Base):
+        C = 4
+
+    assert Base.get_flag_names_and_values() == [("A", 1), ("B", 2)]
+    assert Derived.get_flag_names_and_values() == [("A", 1), ("B", 2), ("C", 4)]
+    assert Base.get_flag_names_and_values() == [("A", 1), ("B", 2)]
+
+    # callers get their own list, which they may modify
+    Base.get_flag_names_and_values().append(("D", 8))
+    assert Base.get_flag_names_and_values() == [("A", 1), ("B", 2)]
+    assert Derived.stringify_value(5) == "A|C"
+    assert Base.get_c_defines() == "#define BASE_A 1\n#define BASE_B 2"
+
+
+def test_literal_lines():
+    lines = LiteralLines("""
+        int x;
+          int y;
+
+        z;
+        """)
+    assert lines.lines == ["int x;", "  int y;", "", "z;"]
+
+    with pytest.raises(ValueError):
+        LiteralLines("""
+            int x;
+          int y;
+            """)
+
+    # only the first line's indentation is stripped, whatever it consists of
+    assert LiteralLines("\n\tint x;\n        y;\n").lines == ["int x;", "       y;"]
+
+
+def test_private_namespace_name():
+    ns = PrivateNamespace([Assign("a", "b")])
+    name = ns.get_namespace_name()
+    assert name.startswith("private_namespace_")
+    assert ns.get_namespace_name() == name
+    assert str(ns).split("\n")[0] == f"namespace {name}"
+
+    ns.append(Assign("c", "d"))
+    assert ns.get_namespace_name() != name
+    assert ns.get_namespace_name() == PrivateNamespace(ns.contents).get_namespace_name()
+
+    # direct changes to the contents or to a child are picked up, too
+    ns.contents.append(Assign("e", "f"))
+    name = ns.get_namespace_name()
+    assert str(ns).split("\n")[0] == f"namespace {name}"
+    ns.contents[-1].rvalue = "g"
+    assert ns.get_namespace_name() != name
+
+
+def test_ifdef_leaves_arguments_alone():
+    elselines = [Assign("a", "c")]
+    ifdef = IfDef("FOO", [Assign("a", "b")], elselines)
+    assert len(elselines) == 1
+    assert str(ifdef) == "#ifdef FOO\na = b;\n#else\na = c;\n#endif"
+
+    ifdef.append(Assign("d", "e"))
+    assert len(elselines) == 1
+    assert str(IfNDef("FOO", [], [])) == "#ifndef FOO\n#endif"
+
+
+def test_inline_initializer():
+    assert str(InlineInitializer(POD(np.int32, "i"), "0")) == "int i = 0"
+    assert (str(InlineInitializer(POD(np.int32, "i"), "{\n  f(a);\n}"))
+            == "int i =\n  {\n    f(a);\n  }")
+
+
+def test_multiline_data_splits_on_newlines_only():
+    # trailing newlines produce an empty last line, other line breaking
+    # characters are left alone
+    assert (str(Initializer(POD(np.int32, "a"), "{\n  1,\n  2}\n"))
+            == "int a =\n  {\n    1,\n    2}\n  ;")
+    assert (str(Initializer(POD(np.int32, "a"), "{1,\r2,\x0c3}\n"))
+            == "int a =\n  {1,\r2,\x0c3}\n  ;")
+    assert (str(If("a &&\nb\n", Statement("x()")))
+            == "if (\n    a &&\n    b\n\n  )\n  x();")
+    assert (str(Block([If("a &&\nb\n", Statement("x()"))]))
+            == "{\n  if (\n      a &&\n      b\n\n    )\n    x();\n}")
+
+
+def test_block_copies_contents():
+    lst = [Assign("a", "b")]
+    b1 = Block(lst)
+    b2 = Block(lst)
+    b1.append(Assign("c", "d"))
+    lst.append(Assign("e", "f"))
+    assert str(b2) == "{\n  a = b;\n}"
+    assert len(b1.contents) == 2
+
+
+def test_make_multiple_ifs():
+    ifs = make_multiple_ifs([
+        ("a", Statement("x()")),
+        ("b", Statement("y()")),
+        (None, Statement("z()")),
+        ], base="last")
+    assert str(ifs) == (
+            "if (a)\n  x();\nelse\n  if (b)\n    y();\n  else\n    z();")
+
+    with pytest.raises(ValueError):
+        make_multiple_ifs([], base="last")
+    assert make_multiple_ifs([]) is None
+
+
+def test_dtype_to_ctype():
+    assert dtype_to_ctype(np.float32) == "float"
+    assert dtype_to_ctype("int32") == "int"
+    assert dtype_to_ctype(np.dtype(np.uint8)) == "unsigned char"
+
+    with pytest.raises(TypeError):
+        dtype_to_ctype("not a dtype")
+    with pytest.raises(ValueError):
+        dtype_to_ctype([("x", np.float32)])
+    with pytest.raises(ValueError):
+        dtype_to_ctype(None)
+
+
+def test_render():
+    lines = Block([Assign("a", "b")]).render()
+    assert lines == ["{", "  a = b;", "}"]
+    Comment("done").render(lines)
+    assert "\n".join(lines) == "{\n  a = b;\n}\n/* done */"